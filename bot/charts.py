@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Sparklines PNG pour Subnavis Bot
+Rendu pur Python (zlib + struct) à partir de l'historique, avec cache des images
+et des file_id Telegram pour ne jamais rendre ni uploader deux fois le même graphique
+"""
+
+import os
+import time
+import asyncio
+import zlib
+import struct
+import hashlib
+from typing import Dict, List, NamedTuple, Optional
+
+from storage import JsonStore, data_path
+from history import history, HistoryStore, Point
+
+# Config
+CHART_WIDTH = 480
+CHART_HEIGHT = 160
+CHART_PADDING = 8
+CHART_MAX_AGE = 3 * 86400  # les images d'anciennes versions sont supprimées après 3 jours
+
+RANGES = {
+    "7d": 7 * 86400,
+    "30d": 30 * 86400,
+}
+
+BACKGROUND = (15, 23, 42)
+GRID = (30, 41, 59)
+UP = (34, 197, 94)
+DOWN = (239, 68, 68)
+
+
+# ============== DOWNSAMPLING ==============
+
+def lttb(points: List[Point], threshold: int) -> List[Point]:
+    """Largest-Triangle-Three-Buckets : réduit à `threshold` points en gardant la forme"""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Moyenne du bucket suivant
+        next_start = int((i + 1) * bucket) + 1
+        next_end = min(int((i + 2) * bucket) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(p[0] for p in points[next_start:next_end]) / span
+        avg_y = sum(p[1] for p in points[next_start:next_end]) / span
+
+        # Point du bucket courant qui forme le plus grand triangle
+        ax, ay = points[a]
+        best, best_area = next_start - 1, -1.0
+        for j in range(int(i * bucket) + 1, next_start):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+# ============== RASTERIZER ==============
+
+def _png(width: int, height: int, pixels: bytearray) -> bytes:
+    """Encode un buffer RGB en PNG"""
+    stride = width * 3
+    raw = b"".join(b"\x00" + bytes(pixels[y * stride:(y + 1) * stride]) for y in range(height))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw, 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def render_sparkline(points: List[Point], width: int = CHART_WIDTH, height: int = CHART_HEIGHT) -> bytes:
+    """Dessine une sparkline (ligne + aire) et retourne le PNG"""
+    pixels = bytearray(bytes(BACKGROUND) * (width * height))
+
+    def plot(x: int, y: int, color: tuple):
+        if 0 <= x < width and 0 <= y < height:
+            i = (y * width + x) * 3
+            pixels[i:i + 3] = bytes(color)
+
+    plot_w = width - 2 * CHART_PADDING
+    plot_h = height - 2 * CHART_PADDING
+
+    # Une valeur par pixel au maximum
+    points = lttb(points, plot_w)
+
+    color = UP if points[-1][1] >= points[0][1] else DOWN
+    fill = tuple((c + 3 * b) // 4 for c, b in zip(color, BACKGROUND))
+
+    t0, t1 = points[0][0], points[-1][0]
+    lo = min(p[1] for p in points)
+    hi = max(p[1] for p in points)
+
+    def to_xy(p: Point) -> tuple:
+        x = CHART_PADDING + (p[0] - t0) * (plot_w - 1) / ((t1 - t0) or 1)
+        if hi == lo:
+            y = CHART_PADDING + plot_h / 2
+        else:
+            y = CHART_PADDING + (hi - p[1]) * (plot_h - 1) / (hi - lo)
+        return x, y
+
+    # Lignes horizontales de repère (haut, milieu, bas)
+    for gy in (CHART_PADDING, CHART_PADDING + plot_h // 2, CHART_PADDING + plot_h - 1):
+        for gx in range(CHART_PADDING, CHART_PADDING + plot_w):
+            plot(gx, gy, GRID)
+
+    coords = [to_xy(p) for p in points]
+    bottom = CHART_PADDING + plot_h - 1
+
+    # Étendue verticale de la ligne dans chaque colonne de pixels
+    top: Dict[int, int] = {}
+    low: Dict[int, int] = {}
+    for (x0, y0), (x1, y1) in zip(coords, coords[1:]):
+        slope = (y1 - y0) / (x1 - x0) if x1 != x0 else 0.0
+        for x in range(round(x0), round(x1) + 1):
+            if x1 == x0:
+                ya, yb = y0, y1
+            else:
+                ya = y0 + (max(x0, x - 0.5) - x0) * slope
+                yb = y0 + (min(x1, x + 0.5) - x0) * slope
+            t, b = round(min(ya, yb)), round(max(ya, yb))
+            if t < top.get(x, bottom + 1):
+                top[x] = t
+            if b > low.get(x, -1):
+                low[x] = b
+
+    # Une seule passe par colonne : aire sous la ligne puis trait (2px minimum)
+    fill_bytes, color_bytes = bytes(fill), bytes(color)
+    for x, t in top.items():
+        if not 0 <= x < width:
+            continue
+        for y in range(max(t, 0), min(bottom, height - 1) + 1):
+            i = (y * width + x) * 3
+            pixels[i:i + 3] = color_bytes if y <= low[x] + 1 else fill_bytes
+
+    return _png(width, height, pixels)
+
+
+# ============== CACHE ==============
+
+class Chart(NamedTuple):
+    key: str
+    first: float
+    last: float
+    file_id: Optional[str]  # déjà uploadé : renvoyer le file_id Telegram
+    png: Optional[bytes]    # sinon : les octets à uploader
+
+
+class ChartCache:
+    """Cache adressé par (série, plage, version du snapshot)"""
+
+    def __init__(self, store: HistoryStore = history):
+        self.history = store
+        self.file_ids = JsonStore("chart_file_ids.json")  # {key: [file_id, timestamp]}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def key(self, series: str, range_: str, version: int) -> str:
+        raw = f"{series}|{range_}|{version}|{CHART_WIDTH}x{CHART_HEIGHT}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    async def get(self, series: str, range_: str) -> Optional[Chart]:
+        """Graphique de la série sur la plage, ou None si pas assez d'historique.
+
+        Le rendu tourne dans un thread pour ne pas bloquer la boucle du bot ; les
+        appels concurrents pour le même graphique attendent le premier rendu.
+        """
+        version = self.history.version(series)
+        if not version:
+            return None
+
+        # La fenêtre est ancrée sur le dernier point : même version => même image
+        pts = self.history.points(series, since=version - RANGES[range_])
+        if len(pts) < 2:
+            return None
+
+        key = self.key(series, range_, version)
+        file_id = self.file_id(key)
+        if file_id:
+            return Chart(key, pts[0][1], pts[-1][1], file_id, None)
+
+        async with self.lock(key):
+            path = data_path("charts", key + ".png")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    png = f.read()
+            else:
+                png = await asyncio.to_thread(render_sparkline, pts)
+                with open(path + ".tmp", "wb") as f:
+                    f.write(png)
+                os.replace(path + ".tmp", path)
+
+        return Chart(key, pts[0][1], pts[-1][1], None, png)
+
+    def lock(self, key: str) -> asyncio.Lock:
+        """Verrou du graphique, tenu pendant le rendu puis pendant le premier upload"""
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    def file_id(self, key: str) -> Optional[str]:
+        cached = self.file_ids.data.get(key)
+        return cached[0] if cached else None
+
+    def remember_file_id(self, key: str, file_id: str):
+        """Mémorise le file_id Telegram après le premier upload"""
+        self.file_ids.data[key] = [file_id, int(time.time())]
+        self.file_ids.save()
+
+    def forget(self, key: str):
+        """Oublie un file_id que Telegram refuse (expiré, autre bot...)"""
+        if self.file_ids.data.pop(key, None) is not None:
+            self.file_ids.save()
+
+    def prune(self, max_age: int = CHART_MAX_AGE):
+        """Supprime les images et file_id des anciennes versions"""
+        cutoff = time.time() - max_age
+        root = os.path.dirname(data_path("charts", "x"))
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        stale = [k for k, (_, ts) in self.file_ids.data.items() if ts < cutoff]
+        for k in stale:
+            del self.file_ids.data[k]
+        if stale:
+            self.file_ids.save()
+        for k in [k for k, lock in self._locks.items() if not lock.locked()]:
+            del self._locks[k]
+
+
+# Instance globale
+chart_cache = ChartCache()
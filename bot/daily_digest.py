@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Daily digest Subnavis
+Calcule une seule fois les sections communes (prix, top movers, whales), puis rend
+le delta de portfolio de chaque utilisateur à partir de l'historique et envoie par lots.
+Le récap marché est aussi posté sur @SubNavisAlerts.
+
+À lancer une fois par jour (cron), par ex. : 0 8 * * * python daily_digest.py
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from telegram import Bot
+from telegram.error import Forbidden, RetryAfter
+from telegram.helpers import escape_markdown
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from taostats_api import taostats
+from history import history, wallet_series, subnet_series
+from storage import iter_json_lines
+
+# Config
+BOT_TOKEN = os.getenv("SUBNAVIS_BOT_TOKEN")
+CHANNEL_ID = "@SubNavisAlerts"
+DIGEST_WINDOW = 86400
+CHUNK_SIZE = 500     # utilisateurs rendus en mémoire à la fois
+SEND_BATCH = 25      # messages envoyés en parallèle (Telegram : ~30 msg/s)
+BATCH_PAUSE = 1.0
+SEND_ATTEMPTS = 3    # tentatives par message en cas de RetryAfter
+TOP_MOVERS = 5
+MIN_WHALE_AMOUNT = 10000
+MAX_WHALE_ROWS = 2000  # plafond de lignes lues pour le résumé whales (signalé dans le rapport)
+
+ACTION_LABELS = {
+    "add_stake": "STAKE",
+    "remove_stake": "UNSTAKE",
+    "transfer": "TRANSFER",
+}
+
+# Logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _change(series: str, since: int) -> Optional[Tuple[float, float]]:
+    """(première, dernière) valeur de la série sur la fenêtre, depuis l'historique"""
+    pts = history.points(series, since=since)
+    if len(pts) < 2:
+        return None
+    return pts[0][1], pts[-1][1]
+
+
+# ============== SECTIONS COMMUNES ==============
+
+async def build_shared_sections(report: dict) -> Dict[str, str]:
+    """Sections identiques pour tous les destinataires, calculées une seule fois"""
+    since = int(time.time()) - DIGEST_WINDOW
+    price = await taostats.get_tao_price()
+
+    # Top movers : variation 24h du prix des subnets, lue dans l'historique
+    movers = []
+    async for s in taostats.iter_subnets():
+        if s["netuid"] is None:
+            continue
+        change = _change(subnet_series(s["netuid"], "price"), since)
+        if change and change[0]:
+            movers.append(((change[1] - change[0]) / change[0] * 100, s["netuid"], s["name"]))
+    movers.sort(reverse=True)
+
+    # Résumé whales des dernières 24h : stakes/unstakes filtrés par montant côté serveur,
+    # agrégés au fil de l'eau
+    count, staked, unstaked, biggest = 0, 0.0, 0.0, None
+    async for w in taostats.iter_delegations(since=since, min_amount=MIN_WHALE_AMOUNT, max_items=MAX_WHALE_ROWS):
+        count += 1
+        if w["type"] == "add_stake":
+            staked += w["amount"]
+        else:
+            unstaked += w["amount"]
+        if biggest is None or w["amount"] > biggest["amount"]:
+            biggest = w
+    report["whale_rows"] = count
+    report["whales_capped"] = count >= MAX_WHALE_ROWS
+
+    sections = {
+        "price": f"💰 *TAO:* ${price['usd']:,.2f} ({price['change_24h']:+.1f}% 24h)\n",
+    }
+
+    if movers:
+        lines = [f"🟢 SN{n} {escape_markdown(name)} {pct:+.1f}%" for pct, n, name in movers[:TOP_MOVERS] if pct > 0]
+        lines += [f"🔴 SN{n} {escape_markdown(name)} {pct:+.1f}%" for pct, n, name in reversed(movers[-TOP_MOVERS:]) if pct < 0]
+        sections["movers"] = "📊 *Top movers (24h):*\n" + ("\n".join(lines) or "_Quiet day_") + "\n"
+    else:
+        sections["movers"] = "📊 *Top movers (24h):*\n_Not enough history yet_\n"
+
+    if biggest:
+        subnet_info = f" on SN{biggest['subnet']}" if biggest.get("subnet") else ""
+        action = ACTION_LABELS.get(biggest["type"], "MOVE")
+        more = "+" if report["whales_capped"] else ""
+        sections["whales"] = (
+            f"🐋 *Whales (24h):* {count:,}{more} moves ≥ {MIN_WHALE_AMOUNT:,} τ\n"
+            f"├ Staked: {staked:,.0f} τ\n"
+            f"├ Unstaked: {unstaked:,.0f} τ\n"
+            f"└ Biggest: {biggest['amount']:,.0f} τ {action}{subnet_info}\n"
+        )
+    else:
+        sections["whales"] = "🐋 *Whales (24h):* _No major activity_\n"
+
+    return sections
+
+
+def market_recap(sections: Dict[str, str]) -> str:
+    """Partie marché du digest, commune à tous les messages"""
+    return "\n".join([sections["price"], sections["movers"], sections["whales"]])
+
+
+# ============== PAR UTILISATEUR ==============
+
+def render_portfolio_delta(wallets: List[str], since: int) -> str:
+    """Delta 24h des wallets suivis, depuis les snapshots (aucun appel API)"""
+    lines = []
+    for wallet in wallets[:5]:
+        change = _change(wallet_series(wallet), since)
+        label = f"`{wallet[:6]}...{wallet[-4:]}`"
+        if change is None:
+            lines.append(f"{label} — _history building up_")
+            continue
+        first, last = change
+        pct = (last - first) / first * 100 if first else 0
+        emoji = "📈" if last >= first else "📉"
+        sign = "+" if last >= first else "-"
+        lines.append(f"{emoji} {label} ${last:,.0f} ({sign}${abs(last - first):,.0f}, {pct:+.1f}%)")
+    return "💼 *Your portfolio (24h):*\n" + "\n".join(lines) + "\n"
+
+
+def iter_user_chunks(size: int = CHUNK_SIZE) -> Iterator[List[Tuple[int, List[str]]]]:
+    """Utilisateurs par paquets, lus ligne à ligne dans users.jsonl.
+
+    Chaque /track ajoute une ligne avec la liste complète des wallets : une première
+    passe ne retient que le numéro de la dernière ligne de chaque utilisateur, la
+    seconde ne garde que celles-là. Les lignes ajoutées entre-temps sont pour demain.
+    """
+    latest: Dict[int, int] = {}
+    for n, record in enumerate(iter_json_lines("users.jsonl")):
+        latest[record["user_id"]] = n
+
+    chunk = []
+    for n, record in enumerate(iter_json_lines("users.jsonl")):
+        if latest.get(record["user_id"]) != n or not record["wallets"]:
+            continue
+        chunk.append((record["user_id"], record["wallets"]))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ============== ENVOI ==============
+
+async def send_one(bot: Bot, chat_id, text: str) -> bool:
+    """Envoie un message ; sur RetryAfter, attend puis réessaie jusqu'à SEND_ATTEMPTS fois"""
+    for attempt in range(1, SEND_ATTEMPTS + 1):
+        try:
+            await bot.send_message(chat_id=chat_id, text=text, parse_mode='Markdown')
+            return True
+        except RetryAfter as e:
+            # int ou timedelta selon la version de python-telegram-bot
+            delay = e.retry_after
+            if isinstance(delay, timedelta):
+                delay = delay.total_seconds()
+            if attempt < SEND_ATTEMPTS:
+                await asyncio.sleep(delay)
+        except Forbidden:
+            return False  # l'utilisateur a bloqué le bot
+        except Exception as e:
+            logger.error(f"Failed to send digest to {chat_id}: {e}")
+            return False
+    logger.error(f"Failed to send digest to {chat_id}: still rate limited after {SEND_ATTEMPTS} attempts")
+    return False
+
+
+async def send_batches(bot: Bot, messages: List[Tuple[int, str]]) -> int:
+    """Envoie par lots de SEND_BATCH, avec une pause entre les lots"""
+    sent = 0
+    for i in range(0, len(messages), SEND_BATCH):
+        batch = messages[i:i + SEND_BATCH]
+        results = await asyncio.gather(*(send_one(bot, chat_id, text) for chat_id, text in batch))
+        sent += sum(results)
+        await asyncio.sleep(BATCH_PAUSE)
+    return sent
+
+
+# ============== JOB ==============
+
+async def run_digest(bot: Bot) -> dict:
+    """Une passe sur toute la base ; retourne le rapport de timing"""
+    report = {"users": 0, "sent": 0, "chunks": 0, "shared_s": 0.0, "render_s": 0.0, "send_s": 0.0}
+    started = time.perf_counter()
+
+    sections = await build_shared_sections(report)
+    recap = market_recap(sections)
+    date = datetime.now(timezone.utc).strftime('%b %d')
+    header = f"🧭 *Subnavis Daily Digest — {date}*\n\n{recap}\n━━━━━━━━━━━━━━━\n"
+    footer = "\n_Full dashboard: subnavis.io_"
+    report["shared_s"] = time.perf_counter() - started
+
+    await send_one(bot, CHANNEL_ID, f"📊 *Daily subnet performance recap — {date}*\n\n{recap}\n#Bittensor #TAO")
+
+    since = int(time.time()) - DIGEST_WINDOW
+    for chunk in iter_user_chunks():
+        t0 = time.perf_counter()
+        messages = [(uid, header + render_portfolio_delta(wallets, since) + footer) for uid, wallets in chunk]
+        t1 = time.perf_counter()
+        report["sent"] += await send_batches(bot, messages)
+        t2 = time.perf_counter()
+
+        report["users"] += len(chunk)
+        report["chunks"] += 1
+        report["render_s"] += t1 - t0
+        report["send_s"] += t2 - t1
+
+    report["total_s"] = time.perf_counter() - started
+    return report
+
+
+async def main():
+    if not BOT_TOKEN:
+        logger.error("SUBNAVIS_BOT_TOKEN not set!")
+        return
+
+    bot = Bot(token=BOT_TOKEN)
+    report = await run_digest(bot)
+    logger.info(
+        f"📬 Digest done: {report['sent']}/{report['users']} sent in {report['chunks']} chunks · "
+        f"shared {report['shared_s']:.2f}s · render {report['render_s']:.2f}s · "
+        f"send {report['send_s']:.2f}s · total {report['total_s']:.2f}s · "
+        f"whale rows {report['whale_rows']}"
+    )
+    if report["whales_capped"]:
+        logger.warning(f"Whale summary capped at {MAX_WHALE_ROWS} rows, totals are partial")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Historique des séries pour Subnavis Bot
+Valeur des portfolios, émission et prix des subnets, échantillonnés périodiquement
+"""
+
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from storage import data_path
+
+# Config
+SNAPSHOT_INTERVAL = 900  # 15 minutes
+RETENTION_SECONDS = 35 * 86400  # un peu plus que la plus longue plage de graphique (30j)
+
+Point = Tuple[int, float]
+
+
+def wallet_series(address: str) -> str:
+    return f"wallet:{address}:usd"
+
+
+def subnet_series(netuid: int, metric: str) -> str:
+    return f"subnet:{netuid}:{metric}"
+
+
+class HistoryStore:
+    """Une série = un fichier append-only de lignes `timestamp,valeur`"""
+
+    def __init__(self, retention: int = RETENTION_SECONDS):
+        self.retention = retention
+        self._versions: Dict[str, int] = {}
+
+    def _path(self, series: str) -> str:
+        return data_path("history", re.sub(r"[^A-Za-z0-9_.-]", "_", series) + ".csv")
+
+    def append(self, series: str, value: float, ts: Optional[int] = None):
+        """Ajoute un point à la série"""
+        ts = int(ts if ts is not None else time.time())
+        with open(self._path(series), "a", encoding="utf-8") as f:
+            f.write(f"{ts},{value!r}\n")
+        self._versions[series] = ts
+
+    def points(self, series: str, since: Optional[int] = None) -> List[Point]:
+        """Points de la série, triés, éventuellement à partir de `since`"""
+        result = []
+        try:
+            with open(self._path(series), "r", encoding="utf-8") as f:
+                for line in f:
+                    ts, _, value = line.strip().partition(",")
+                    try:
+                        point = (int(ts), float(value))
+                    except ValueError:
+                        continue  # ligne tronquée (arrêt pendant une écriture)
+                    if since is None or point[0] >= since:
+                        result.append(point)
+        except FileNotFoundError:
+            return []
+        result.sort()
+        if result:
+            self._versions[series] = result[-1][0]
+        return result
+
+    def version(self, series: str) -> int:
+        """Version de la série = timestamp du dernier point (0 si vide)"""
+        if series not in self._versions:
+            pts = self.points(series)
+            self._versions[series] = pts[-1][0] if pts else 0
+        return self._versions[series]
+
+    def prune_all(self):
+        """Applique la rétention à toutes les séries (réécrit chaque fichier)"""
+        cutoff = int(time.time()) - self.retention
+        root = os.path.dirname(self._path("x"))
+        for name in os.listdir(root):
+            if not name.endswith(".csv"):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "r", encoding="utf-8") as f:
+                kept = [line for line in f
+                        if line.partition(",")[0].isdigit() and int(line.partition(",")[0]) >= cutoff]
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.writelines(kept)
+            os.replace(path + ".tmp", path)
+
+
+# Instance globale
+history = HistoryStore()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Market board live pour @SubNavisAlerts
+Un seul message épinglé, re-rendu périodiquement et édité seulement quand son contenu change
+"""
+
+import time
+import heapq
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from typing import Optional
+from telegram import Bot
+from telegram.error import BadRequest
+from telegram.helpers import escape_markdown
+
+from storage import JsonStore
+from taostats_api import taostats
+
+# Config
+BOARD_INTERVAL = 60        # re-rendu toutes les minutes
+MAX_EDITS_PER_HOUR = 20    # bien en dessous des limites Telegram pour un channel
+MIN_EDIT_INTERVAL = 3600 / MAX_EDITS_PER_HOUR  # éditions étalées régulièrement sur l'heure (3 min)
+TOP_SUBNETS = 10
+
+logger = logging.getLogger(__name__)
+
+
+async def render_board() -> Optional[str]:
+    """Contenu du board, sans horodatage (pour que le hash ne change qu'avec les données)"""
+    price = await taostats.get_tao_price()
+    top = heapq.nlargest(
+        TOP_SUBNETS,
+        [s async for s in taostats.iter_subnets() if s["netuid"] is not None],
+        key=lambda s: s["emission"]
+    )
+
+    if not price["usd"] or not top:
+        return None  # API indisponible : on garde le board tel quel
+
+    text = f"""🧭 *SubNavis Market Board*
+
+💰 *TAO:* ${price['usd']:,.2f} ({price['change_24h']:+.1f}% 24h)
+
+📊 *Top subnets by emission:*
+"""
+    for rank, s in enumerate(top, 1):
+        text += f"{rank}. *SN{s['netuid']}* {escape_markdown(s['name'])} — {s['emission']:,.4f}\n"
+
+    return text
+
+
+class MarketBoard:
+    """Message unique du channel, édité sur place (ID persisté entre redémarrages)"""
+
+    def __init__(self, chat_id: str):
+        self.chat_id = chat_id
+        self.state = JsonStore("market_board.json", {"message_id": None, "hash": None, "edits": []})
+
+    def _can_edit(self, now: float) -> bool:
+        edits = [t for t in self.state.data["edits"] if t > now - 3600]
+        self.state.data["edits"] = edits
+        if edits and now - edits[-1] < MIN_EDIT_INTERVAL:
+            return False
+        return len(edits) < MAX_EDITS_PER_HOUR
+
+    async def tick(self, bot: Bot):
+        """Re-rend le board ; poste, édite ou ne fait rien selon le hash et le budget d'éditions"""
+        body = await render_board()
+        if body is None:
+            return
+        digest = hashlib.sha256(body.encode()).hexdigest()
+        data = self.state.data
+        now = time.time()
+
+        if data["message_id"] and digest == data["hash"]:
+            return  # rien n'a changé : aucun appel Telegram
+        if data["message_id"] and not self._can_edit(now):
+            return  # le prochain tick retentera, avec des données encore plus fraîches
+
+        text = body + f"\n_Updated {datetime.now().strftime('%H:%M UTC')} · subnavis.io_"
+
+        if data["message_id"]:
+            try:
+                await bot.edit_message_text(
+                    chat_id=self.chat_id,
+                    message_id=data["message_id"],
+                    text=text,
+                    parse_mode='Markdown'
+                )
+            except BadRequest as e:
+                if "not modified" in str(e).lower():
+                    pass
+                elif "not found" in str(e).lower():
+                    logger.warning("Market board message is gone, posting a new one")
+                    data["message_id"] = None
+                    self.state.save()
+                    return
+                else:
+                    raise
+            data["edits"].append(now)
+        else:
+            message = await bot.send_message(chat_id=self.chat_id, text=text, parse_mode='Markdown')
+            data["message_id"] = message.message_id
+            try:
+                await bot.pin_chat_message(
+                    chat_id=self.chat_id,
+                    message_id=message.message_id,
+                    disable_notification=True
+                )
+            except Exception as e:
+                logger.warning(f"Could not pin market board: {e}")
+            logger.info(f"Posted market board to {self.chat_id}")
+
+        data["hash"] = digest
+        self.state.save()
+
+    async def run(self, bot: Bot, interval: int = BOARD_INTERVAL):
+        """Boucle de rafraîchissement du board"""
+        while True:
+            try:
+                await self.tick(bot)
+            except Exception as e:
+                logger.error(f"Market board error: {e}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Paiements TAO pour les abonnements Subnavis
+Intentions de paiement + watcher qui scanne les transferts reçus depuis un watermark
+de bloc et active le plan correspondant, sans vérification manuelle
+"""
+
+import os
+import time
+import random
+import string
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from storage import JsonStore
+from taostats_api import taostats
+
+# Config
+PAYMENT_ADDRESS = os.getenv("SUBNAVIS_PAYMENT_ADDRESS", "5GxcV1SNdHPzrNGCdETY6QR9jPzZgY6igMjDmWDcEuXoibMY")
+POLL_INTERVAL = 60  # 1 minute = 5 blocs
+INTENT_TTL = 48 * 3600
+EXPIRED_GRACE = 14 * 86400  # montant d'une intention expirée réservé ensuite pendant 14 jours
+MAX_PENDING_INTENTS = 3     # par utilisateur
+PLAN_DURATION = 365 * 86400
+PROCESSED_RETENTION_BLOCKS = 7200  # ~24h de hashes gardés sous le watermark
+
+RAO = 10**9
+DUST_UNIT = 1000  # 0.000001 τ : écart ajouté pour rendre chaque montant unique
+DUST_OFFSETS = 999  # écarts possibles par plan (au plus +0.000999 τ)
+
+PLANS = {
+    "navigator": {"name": "Navigator", "price_rao": 400_000_000},  # 0.4 τ/an
+    "captain": {"name": "Captain", "price_rao": 1_000_000_000},    # 1.0 τ/an
+}
+
+IndexKey = Tuple[int, Optional[str]]
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentWatcher:
+    """Rapproche les transferts entrants des intentions en attente.
+
+    Intentions, watermark, hashes traités et plans actifs vivent dans un seul
+    document JSON sauvegardé une fois par scan : un redémarrage reprend au
+    watermark et un transfert déjà traité n'active jamais deux fois.
+    """
+
+    def __init__(self, address: str = PAYMENT_ADDRESS):
+        self.address = address
+        self.store = JsonStore("payments.json", {
+            "watermark": None,  # dernier bloc entièrement traité (bloc courant au premier lancement)
+            "intents": {},      # {intent_id: {...}}
+            "expired": {},      # intentions expirées, montants encore réservés : {intent_id: {..., "expired": ts}}
+            "processed": {},    # {tx_hash: block}
+            "unmatched": [],    # transferts reçus sans intention correspondante, à traiter par le support
+            "plans": {},        # {telegram_id: {"plan": ..., "expires": ts}}
+        })
+        self.store.data.setdefault("unmatched", [])
+        self.store.data.setdefault("expired", {})
+        self.index: Dict[IndexKey, str] = {}
+        for intent_id, intent in self.store.data["intents"].items():
+            self._index_add(intent_id, intent)
+        for intent_id, intent in self.store.data["expired"].items():
+            self._index_add(intent_id, intent)
+
+    # ----- Index (montant, memo) -----
+
+    def _keys(self, intent: dict) -> List[IndexKey]:
+        # Le montant exact (avec l'écart) suffit ; avec le memo, le prix rond est aussi accepté.
+        # Pas de rapprochement par expéditeur : suivre un wallet ne prouve pas qu'on le possède.
+        base = PLANS[intent["plan"]]["price_rao"]
+        keys = [(intent["amount_rao"], None)]
+        for amount in {base, intent["amount_rao"]}:
+            keys.append((amount, intent["memo"]))
+        return keys
+
+    def _index_add(self, intent_id: str, intent: dict):
+        for key in self._keys(intent):
+            self.index[key] = intent_id
+
+    def _index_remove(self, intent_id: str, intent: dict):
+        for key in self._keys(intent):
+            if self.index.get(key) == intent_id:
+                del self.index[key]
+
+    def match(self, transfer: dict) -> Optional[str]:
+        """Intention correspondant au transfert : memo, puis montant seul"""
+        amount = transfer["amount_rao"]
+        keys = [(amount, None)]
+        if transfer.get("memo"):
+            keys.insert(0, (amount, transfer["memo"].strip().upper()))
+        for key in keys:
+            intent_id = self.index.get(key)
+            if intent_id is not None:
+                return intent_id
+        return None
+
+    # ----- Intentions -----
+
+    def create_intent(self, user_id: int, plan: str) -> Optional[dict]:
+        """Intention de paiement avec un montant unique, ou None si aucune n'est possible.
+
+        Une intention en attente pour le même plan est réutilisée telle quelle ; les
+        autres restent valables jusqu'à expiration, dans la limite de MAX_PENDING_INTENTS.
+        """
+        self.expire_intents()
+
+        pending = [i for i in self.store.data["intents"].values() if i["user_id"] == user_id]
+        for intent in pending:
+            if intent["plan"] == plan:
+                return intent
+        if len(pending) >= MAX_PENDING_INTENTS:
+            logger.warning(f"User {user_id} already has {len(pending)} pending payment intents")
+            return None
+
+        # Montants pris par les intentions en attente et celles expirées depuis peu
+        base = PLANS[plan]["price_rao"]
+        taken = {amount for amount, memo in self.index if memo is None}
+        free = [base + DUST_UNIT * n for n in range(1, DUST_OFFSETS + 1) if base + DUST_UNIT * n not in taken]
+        if not free:
+            logger.error(f"No unique amount left for the {plan} plan")
+            return None
+
+        memo = "SN-" + "".join(random.choices(string.ascii_uppercase + string.digits, k=6))
+        intent = {
+            "user_id": user_id,
+            "plan": plan,
+            "amount_rao": random.choice(free),
+            "memo": memo,
+            "created": int(time.time()),
+        }
+        self.store.data["intents"][memo] = intent
+        self._index_add(memo, intent)
+        self.store.save()
+        return intent
+
+    def expire_intents(self):
+        """Passe les intentions périmées en `expired`, puis libère leurs montants après EXPIRED_GRACE.
+
+        Pendant la période de grâce, un paiement tardif tombe en `unmatched` au lieu
+        d'activer l'intention d'un autre utilisateur qui aurait reçu le même montant.
+        """
+        now = time.time()
+        data = self.store.data
+        for intent_id, intent in list(data["intents"].items()):
+            if intent["created"] < now - INTENT_TTL:
+                data["expired"][intent_id] = dict(data["intents"].pop(intent_id), expired=int(now))
+        for intent_id, intent in list(data["expired"].items()):
+            if intent["expired"] < now - EXPIRED_GRACE:
+                self._index_remove(intent_id, intent)
+                del data["expired"][intent_id]
+
+    # ----- Plans -----
+
+    def active_plan(self, user_id: int) -> Optional[str]:
+        """Plan payant actif de l'utilisateur, ou None (gratuit)"""
+        sub = self.store.data["plans"].get(str(user_id))
+        if sub and sub["expires"] > time.time():
+            return sub["plan"]
+        return None
+
+    def _activate(self, intent: dict) -> dict:
+        key = str(intent["user_id"])
+        current = self.store.data["plans"].get(key)
+        # Un renouvellement prolonge l'abonnement en cours
+        start = max(time.time(), current["expires"]) if current else time.time()
+        sub = {"plan": intent["plan"], "expires": int(start + PLAN_DURATION)}
+        self.store.data["plans"][key] = sub
+        return sub
+
+    # ----- Scan -----
+
+    async def scan(self) -> List[Tuple[dict, dict]]:
+        """Un cycle de polling : retourne les (intention, abonnement) activés"""
+        data = self.store.data
+        if not data["watermark"]:
+            # Premier lancement : on part du bloc courant plutôt que de tout l'historique
+            latest = await taostats.get_latest_block()
+            if not latest:
+                return []
+            data["watermark"] = latest
+            self.store.save()
+            logger.info(f"Payment watcher starting at block {latest}")
+        watermark = data["watermark"]
+        processed = data["processed"]
+        activated = []
+        highest = watermark
+
+        # Ordre croissant : si le scan s'interrompt, tout ce qui est sous `highest` a été vu
+        try:
+            async for transfer in taostats.iter_transfers(self.address, since_block=watermark):
+                highest = max(highest, transfer["block"])
+                tx_hash = transfer["hash"] or f"{transfer['block']}:{transfer['from']}:{transfer['amount_rao']}"
+                if tx_hash in processed:
+                    continue
+                processed[tx_hash] = transfer["block"]
+
+                intent_id = self.match(transfer)
+                if intent_id is None or intent_id in data["expired"]:
+                    # Paiement tardif, montant erroné... gardé pour vérification manuelle
+                    late = data["expired"].get(intent_id)
+                    logger.warning(
+                        f"Unmatched TAO transfer {tx_hash}: {format_tao(transfer['amount_rao'])} τ "
+                        f"from {transfer['from']} (block {transfer['block']})"
+                        + (f", late payment for expired intent {intent_id} of user {late['user_id']}" if late else "")
+                    )
+                    data["unmatched"].append({
+                        "hash": tx_hash,
+                        "from": transfer["from"],
+                        "amount_rao": transfer["amount_rao"],
+                        "memo": transfer.get("memo"),
+                        "block": transfer["block"],
+                        "expired_intent": intent_id,
+                    })
+                    continue
+                intent = data["intents"].pop(intent_id)
+                self._index_remove(intent_id, intent)
+                activated.append((dict(intent, tx_hash=tx_hash), self._activate(intent)))
+        except Exception as e:
+            logger.error(f"Payment scan interrupted at block {highest}: {e}")
+
+        # Le bloc du watermark est rescanné au cycle suivant (couvert par `processed`)
+        data["watermark"] = highest
+        for tx_hash, block in list(processed.items()):
+            if block < highest - PROCESSED_RETENTION_BLOCKS:
+                del processed[tx_hash]
+        self.expire_intents()
+        self.store.save()
+        return activated
+
+    async def run(self, notify: Callable[[dict, dict], Awaitable[None]], interval: int = POLL_INTERVAL):
+        """Boucle de polling ; `notify` est appelé pour chaque activation"""
+        while True:
+            try:
+                activated = await self.scan()
+            except Exception as e:
+                logger.error(f"Payment watcher error: {e}")
+                activated = []
+            for intent, sub in activated:
+                logger.info(f"Activated {intent['plan']} for {intent['user_id']} (tx {intent['tx_hash']})")
+                try:
+                    await notify(intent, sub)
+                except Exception as e:
+                    # Une notification en échec (bot bloqué...) n'empêche pas les suivantes
+                    logger.error(f"Could not notify {intent['user_id']} of activation: {e}")
+            await asyncio.sleep(interval)
+
+
+def format_tao(rao: int) -> str:
+    return f"{rao / RAO:.6f}".rstrip("0").rstrip(".")
+
+
+# Instance globale
+payment_watcher = PaymentWatcher()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Index de recherche en mémoire pour le mode inline (@bot <query>)
+Trie de préfixes + index trigrammes pour le flou, construit à partir du snapshot
+des subnets/validateurs et mis à jour incrémentalement
+"""
+
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+from telegram.helpers import escape_markdown
+
+# Config
+MAX_RESULTS = 20  # Telegram accepte 50 résultats inline max
+FUZZY_THRESHOLD = 0.3
+CACHE_SIZE = 2048
+PRECOMPUTE_PREFIX_LEN = 2  # préfixes de 1-2 caractères précalculés à chaque mise à jour
+
+
+class Entry(NamedTuple):
+    id: str             # "sn18", "val:<hotkey>"
+    kind: str           # "subnet" | "validator"
+    title: str
+    description: str
+    text: str           # message envoyé quand on choisit le résultat (Markdown, noms échappés)
+    terms: Tuple[str, ...]
+    rank: float         # tri des résultats (émission, stake)
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9 ]+", " ", text.lower()).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def subnet_entry(s: dict) -> Entry:
+    netuid = s["netuid"]
+    name = s.get("name") or f"SN{netuid}"
+    price = f" · {s['price']:,.4f} τ" if s.get("price") else ""
+    return Entry(
+        id=f"sn{netuid}",
+        kind="subnet",
+        title=f"SN{netuid} · {name}",
+        description=f"Emission {s.get('emission', 0):,.4f}{price}",
+        text=(
+            f"📊 *SN{netuid} — {escape_markdown(name)}*\n\n"
+            f"⚡ Emission: {s.get('emission', 0):,.4f}\n"
+            + (f"💱 Price: {s['price']:,.4f} τ\n" if s.get("price") else "")
+            + f"⏱️ Tempo: {s.get('tempo') or '—'}\n\n"
+            f"🌐 subnavis.io/subnet.html?id={netuid}"
+        ),
+        terms=(name, f"sn{netuid}", str(netuid)),
+        rank=float(s.get("emission") or 0),
+    )
+
+
+def validator_entry(v: dict) -> Entry:
+    hotkey = v["hotkey"]
+    return Entry(
+        id=f"val:{hotkey}",
+        kind="validator",
+        title=f"🛡️ {v['name']}",
+        description=f"Validator · {v.get('stake', 0):,.0f} τ staked · {hotkey[:8]}...",
+        text=(
+            f"🛡️ *{escape_markdown(v['name'])}*\n\n"
+            f"🔑 Hotkey: `{hotkey}`\n"
+            f"💰 Stake: {v.get('stake', 0):,.0f} τ"
+        ),
+        terms=(v["name"], hotkey),
+        rank=float(v.get("stake") or 0),
+    )
+
+
+class _Node:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.ids: Set[str] = set()
+
+
+class SearchIndex:
+    """Recherche par préfixe (trie) puis floue (trigrammes), résultats cachés par requête.
+
+    Seuls les termes sont indexés : description, texte et rang se remplacent dans
+    `entries` sans toucher au trie ni aux trigrammes, et le cache ne garde que des ids.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Entry] = {}           # affichage, lu au moment de la recherche
+        self._terms: Dict[str, Tuple[str, ...]] = {}  # termes indexés de chaque entrée
+        self.root = _Node()
+        self.grams: Dict[str, Set[str]] = {}
+        self._entry_grams: Dict[str, Set[str]] = {}
+        self._cache: "OrderedDict[str, List[str]]" = OrderedDict()
+
+    # ----- Construction -----
+
+    def _tokens(self, terms: Tuple[str, ...]) -> Set[str]:
+        return {tok for term in terms for tok in normalize(term).split()}
+
+    def _add(self, entry: Entry):
+        self.entries[entry.id] = entry
+        self._terms[entry.id] = entry.terms
+        for tok in self._tokens(entry.terms):
+            node = self.root
+            for ch in tok:
+                node = node.children.setdefault(ch, _Node())
+                node.ids.add(entry.id)
+        # Le flou ne porte que sur le nom (terms[0]), pas sur les hotkeys
+        grams = trigrams(entry.terms[0])
+        self._entry_grams[entry.id] = grams
+        for g in grams:
+            self.grams.setdefault(g, set()).add(entry.id)
+
+    def _remove(self, entry_id: str):
+        del self.entries[entry_id]
+        for tok in self._tokens(self._terms.pop(entry_id)):
+            path = [self.root]
+            for ch in tok:
+                node = path[-1].children.get(ch)
+                if node is None:
+                    break
+                node.ids.discard(entry_id)
+                path.append(node)
+            # Élaguer les branches devenues vides
+            for parent, ch in zip(reversed(path[:-1]), reversed(tok[:len(path) - 1])):
+                child = parent.children[ch]
+                if child.ids or child.children:
+                    break
+                del parent.children[ch]
+        for g in self._entry_grams.pop(entry_id):
+            ids = self.grams.get(g)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self.grams[g]
+
+    def update(self, entries: Iterable[Entry]) -> int:
+        """Applique un nouveau snapshot ; seules les entrées dont les termes changent sont réindexées"""
+        fresh = {e.id: e for e in entries}
+        changed = 0
+        reordered: List[Entry] = []  # versions dont l'appartenance ou le classement a changé
+        for entry_id in [i for i in self.entries if i not in fresh]:
+            reordered.append(self.entries[entry_id])
+            self._remove(entry_id)
+            changed += 1
+        for entry_id, entry in fresh.items():
+            old = self.entries.get(entry_id)
+            if old == entry:
+                continue
+            changed += 1
+            if old is None:
+                self._add(entry)
+                reordered.append(entry)
+            elif old.terms != entry.terms:
+                self._remove(entry_id)
+                self._add(entry)
+                reordered += [old, entry]
+            else:
+                self.entries[entry_id] = entry
+                if (old.kind, old.rank) != (entry.kind, entry.rank):
+                    reordered.append(entry)
+
+        if reordered:
+            self._invalidate(reordered)
+            self._precompute()
+        return changed
+
+    def _invalidate(self, entries: List[Entry]):
+        """Retire du cache les requêtes dont ces entrées peuvent changer les résultats"""
+        prefixes = {tok[:i] for e in entries for tok in self._tokens(e.terms) for i in range(1, len(tok) + 1)}
+        grams = set().union(*(trigrams(e.terms[0]) for e in entries))
+        for key in list(self._cache):
+            tokens = key.split()
+            # Une entrée ne correspond à la requête que si le premier mot en préfixe un des siens,
+            # ou (flou) si elle partage un trigramme avec la requête
+            if not tokens or tokens[0] in prefixes or (len(key) >= 3 and not grams.isdisjoint(trigrams(key))):
+                del self._cache[key]
+
+    def _precompute(self):
+        """Précalcule les préfixes courts, les plus demandés pendant la frappe (ceux encore en cache sont gratuits)"""
+        self.search("")
+        frontier = [("", self.root)]
+        for _ in range(PRECOMPUTE_PREFIX_LEN):
+            frontier = [(prefix + ch, child) for prefix, node in frontier for ch, child in node.children.items()]
+            for prefix, _node in frontier:
+                self.search(prefix)
+
+    # ----- Recherche -----
+
+    def _prefix_ids(self, token: str) -> Set[str]:
+        node = self.root
+        for ch in token:
+            node = node.children.get(ch)
+            if node is None:
+                return set()
+        return node.ids
+
+    def _ranked(self, ids: Iterable[str]) -> List[Entry]:
+        return sorted((self.entries[i] for i in ids), key=lambda e: (e.kind != "subnet", -e.rank))
+
+    def search(self, query: str, limit: int = MAX_RESULTS) -> List[Entry]:
+        """Résultats pour la requête : préfixes d'abord, complétés par le flou"""
+        key = normalize(query)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return [self.entries[i] for i in self._cache[key][:limit]]
+
+        tokens = key.split()
+        if not tokens:
+            results = self._ranked(self.entries)[:MAX_RESULTS]
+        else:
+            ids = set(self._prefix_ids(tokens[0]))
+            for tok in tokens[1:]:
+                ids &= self._prefix_ids(tok)
+            results = self._ranked(ids)
+
+            # Une correspondance exacte sur le netuid passe devant
+            exact = f"sn{key.replace(' ', '').removeprefix('sn')}"
+            if exact in self.entries and exact in ids:
+                results.remove(self.entries[exact])
+                results.insert(0, self.entries[exact])
+
+            if len(results) < MAX_RESULTS and len(key) >= 3:
+                results += self._fuzzy(key, exclude=ids)
+            results = results[:MAX_RESULTS]
+
+        self._cache[key] = [e.id for e in results]
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return results[:limit]
+
+    def _fuzzy(self, key: str, exclude: Set[str]) -> List[Entry]:
+        """Similarité trigrammes (Dice) entre la requête et le nom des entrées"""
+        query_grams = trigrams(key)
+        shared: Dict[str, int] = {}
+        for g in query_grams:
+            for entry_id in self.grams.get(g, ()):
+                if entry_id not in exclude:
+                    shared[entry_id] = shared.get(entry_id, 0) + 1
+
+        scored = []
+        for entry_id, count in shared.items():
+            score = 2 * count / (len(query_grams) + len(self._entry_grams[entry_id]))
+            if score >= FUZZY_THRESHOLD:
+                scored.append((score, self.entries[entry_id].rank, entry_id))
+        scored.sort(reverse=True)
+        return [self.entries[entry_id] for _, _, entry_id in scored[:MAX_RESULTS]]
+
+
+# Instance globale
+search_index = SearchIndex()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Stockage local pour Subnavis Bot
+Petits fichiers JSON persistants (en attendant Supabase)
+"""
+
+import os
+import json
+import tempfile
+from typing import Any, Iterator
+
+# Config
+DATA_DIR = os.getenv(
+    "SUBNAVIS_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+)
+
+
+def data_path(*parts: str) -> str:
+    """Chemin dans le dossier de données (créé si besoin)"""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+class JsonStore:
+    """Document JSON persistant, réécrit atomiquement à chaque save()"""
+
+    def __init__(self, name: str, default: Any = None):
+        self.path = data_path(name)
+        self.data = self._load(default if default is not None else {})
+
+    def _load(self, default: Any) -> Any:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+        except (OSError, ValueError) as e:
+            print(f"Storage error ({self.path}): {e}")
+            return default
+
+    def save(self):
+        """Écrit dans un fichier temporaire puis remplace, pour ne jamais laisser un JSON tronqué"""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.data, f)
+            os.replace(tmp, self.path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+def append_json_line(name: str, record: Any):
+    """Ajoute un enregistrement en fin de fichier JSON lines, sans réécrire le reste"""
+    line = (json.dumps(record) + "\n").encode("utf-8")
+    with open(data_path(name), "ab+") as f:
+        # Une ligne tronquée par une écriture interrompue ne doit pas absorber la suivante
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                line = b"\n" + line
+        f.write(line)
+
+
+def iter_json_lines(name: str) -> Iterator[Any]:
+    """Enregistrements d'un fichier JSON lines, lus ligne à ligne.
+
+    Une ligne illisible (écriture interrompue) est signalée puis ignorée.
+    """
+    try:
+        f = open(data_path(name), "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                print(f"Storage error ({name}): {e}")
@@ -8,17 +8,21 @@ Commands:
 - /track <wallet> - Track a wallet
 - /portfolio - View your positions
 - /whale - Latest whale alerts
+- /chart [netuid] [7d|30d] - Trend sparklines
 - /alerts - Configure alerts
 - /help - Help
+- @bot <query> - Inline subnet/validator search (inline mode must be enabled in BotFather)
 """
 
 import os
 import json
+import time
 import asyncio
 import logging
 from datetime import datetime
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent
+from telegram.error import BadRequest
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, InlineQueryHandler, MessageHandler, filters
 from dotenv import load_dotenv
 
 # Charger les variables d'environnement depuis .env
@@ -26,6 +30,11 @@ load_dotenv()
 
 # Import du client TaoStats pour les vraies données
 from taostats_api import taostats, format_portfolio, format_whale_alerts
+from history import history, wallet_series, subnet_series, SNAPSHOT_INTERVAL
+from charts import chart_cache, RANGES
+from search_index import search_index, subnet_entry, validator_entry
+from payments import payment_watcher, PLANS, PAYMENT_ADDRESS, INTENT_TTL, format_tao
+from storage import append_json_line, iter_json_lines
 
 # Config - Charger depuis variables d'environnement
 BOT_TOKEN = os.getenv("SUBNAVIS_BOT_TOKEN")
@@ -35,12 +44,15 @@ SUPABASE_KEY = os.getenv("SUBNAVIS_SUPABASE_KEY")
 if not BOT_TOKEN:
     raise ValueError("❌ SUBNAVIS_BOT_TOKEN non défini ! Ajoute-le dans les variables d'environnement.")
 
+INLINE_CACHE_TIME = 300  # cache côté Telegram, aligné sur le rythme des snapshots
+
 # Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # User data storage (in production, use Supabase)
-user_wallets = {}  # {telegram_id: [wallet1, wallet2, ...]}
+# users.jsonl : une ligne {"user_id", "wallets"} ajoutée à chaque /track, la dernière fait foi (lu aussi par daily_digest.py)
+user_wallets = {r["user_id"]: r["wallets"] for r in iter_json_lines("users.jsonl")}  # {telegram_id: [wallet1, wallet2, ...]}
 user_alerts = {}   # {telegram_id: {subnet: threshold, ...}}
 
 # ============== HANDLERS ==============
@@ -62,6 +74,7 @@ I'm your Bittensor subnet navigator. I can help you:
 /track `<wallet>` — Add a wallet to track
 /portfolio — View your positions
 /whale — Latest whale movements
+/chart — Portfolio & subnet trends
 /alerts — Configure your alerts
 /pricing — View premium plans
 
@@ -105,13 +118,13 @@ async def track(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Invalid wallet address. TAO addresses start with '5'.")
         return
     
-    # Check if user already tracking (free = 1 wallet)
-    if user_id in user_wallets and len(user_wallets[user_id]) >= 1:
-        # Check if it's the same wallet
-        if wallet in user_wallets[user_id]:
-            await update.message.reply_text(f"✅ You're already tracking this wallet!")
-            return
-        
+    # Check if it's the same wallet
+    if wallet in user_wallets.get(user_id, []):
+        await update.message.reply_text(f"✅ You're already tracking this wallet!")
+        return
+    
+    # Check if user already tracking (free = 1 wallet, paid plans = unlimited)
+    if user_id in user_wallets and len(user_wallets[user_id]) >= 1 and not payment_watcher.active_plan(user_id):
         # Free user trying to add more
         keyboard = [[InlineKeyboardButton("💎 Upgrade to Pro", callback_data="upgrade")]]
         await update.message.reply_text(
@@ -127,6 +140,7 @@ async def track(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if user_id not in user_wallets:
         user_wallets[user_id] = []
     user_wallets[user_id].append(wallet)
+    append_json_line("users.jsonl", {"user_id": user_id, "wallets": user_wallets[user_id]})
     
     # Get wallet info (mock for now)
     await update.message.reply_text(
@@ -161,6 +175,7 @@ async def portfolio(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     keyboard = [
         [InlineKeyboardButton("🔄 Refresh", callback_data="refresh_portfolio")],
+        [InlineKeyboardButton("📈 30d Chart", callback_data="chart_portfolio_30d")],
         [InlineKeyboardButton("🌐 Full Dashboard", url="https://subnavis.io/portfolio.html")]
     ]
     
@@ -171,6 +186,33 @@ async def portfolio(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='Markdown',
         reply_markup=InlineKeyboardMarkup(keyboard)
     )
+    
+    # Sparkline 7j si on a déjà de l'historique
+    await send_chart(update.message, wallet_series(wallet), "7d", "💼 Portfolio value", "${:,.0f}", quiet=True)
+
+async def chart(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Trend sparklines: /chart [7d|30d] for the portfolio, /chart <netuid> [price] [7d|30d] for a subnet"""
+    args = [a.lower() for a in context.args]
+    range_ = next((a for a in args if a in RANGES), "7d")
+    netuid = next((int(a.removeprefix("sn")) for a in args if a.removeprefix("sn").isdigit()), None)
+    
+    if netuid is not None:
+        if "price" in args:
+            await send_chart(update.message, subnet_series(netuid, "price"), range_, f"📊 SN{netuid} price", "{:,.4f} τ")
+        else:
+            await send_chart(update.message, subnet_series(netuid, "emission"), range_, f"📊 SN{netuid} emission", "{:,.4f}")
+        return
+    
+    user_id = update.effective_user.id
+    if user_id not in user_wallets or not user_wallets[user_id]:
+        await update.message.reply_text(
+            "📍 *No wallets tracked yet!*\n\n"
+            "Use `/track <wallet>` first, or `/chart <netuid>` for a subnet.",
+            parse_mode='Markdown'
+        )
+        return
+    
+    await send_chart(update.message, wallet_series(user_wallets[user_id][0]), range_, "💼 Portfolio value", "${:,.0f}")
 
 async def whale(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show latest whale alerts - VRAIES DONNÉES via TaoStats"""
@@ -289,10 +331,14 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /track `<wallet>` — Track a wallet
 /portfolio — View your positions
 /whale — Latest whale alerts
+/chart `[netuid] [7d|30d]` — Trend charts
 /alerts — Configure notifications
 /pricing — View plans
 /help — This message
 
+*Inline search:*
+Type `@bittensorwalletbot <name or netuid>` in any chat
+
 *Quick Links:*
 🌐 Dashboard: subnavis.io
 📊 Portfolio: subnavis.io/portfolio.html
@@ -321,14 +367,38 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await pricing(update, context)
     
     elif query.data == "pay_tao":
+        keyboard = [
+            [InlineKeyboardButton(f"🧭 Navigator — {format_tao(PLANS['navigator']['price_rao'])} τ/year", callback_data="pay_tao_navigator")],
+            [InlineKeyboardButton(f"🚀 Captain — {format_tao(PLANS['captain']['price_rao'])} τ/year", callback_data="pay_tao_captain")]
+        ]
+        await query.message.reply_text(
+            "🐉 *Pay with TAO*\n\nWhich plan would you like?",
+            parse_mode='Markdown',
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+    
+    elif query.data.startswith("pay_tao_"):
+        plan = query.data.replace("pay_tao_", "")
+        if plan not in PLANS:
+            return
+        
+        intent = payment_watcher.create_intent(update.effective_user.id, plan)
+        if intent is None:
+            await query.message.reply_text(
+                "⏳ Too many pending TAO payment requests right now — "
+                "complete one you already have, or try again later."
+            )
+            return
+        hours_left = max(1, int(intent["created"] + INTENT_TTL - time.time()) // 3600)
         await query.message.reply_text(
-            "🐉 *Pay with TAO*\n\n"
-            "Send your payment to:\n"
-            "`5GxcV1SNdHPzrNGCdETY6QR9jPzZgY6igMjDmWDcEuXoibMY`\n\n"
-            "*Navigator (1 year):* 0.4 τ\n"
-            "*Captain (1 year):* 1.0 τ\n\n"
-            "After sending, reply with your TX hash and we'll activate your account within 24h!\n\n"
-            "_Include your Telegram username in the memo if possible._",
+            f"🐉 *Pay with TAO — {PLANS[plan]['name']} (1 year)*\n\n"
+            f"Send exactly *{format_tao(intent['amount_rao'])} τ* to:\n"
+            f"`{PAYMENT_ADDRESS}`\n\n"
+            f"Memo (if your wallet supports it): `{intent['memo']}`\n\n"
+            f"Your plan activates automatically about a minute after the transfer is confirmed — "
+            f"no need to send us the TX hash.\n\n"
+            f"_With the memo, the round amount works too. "
+            f"This request expires in {hours_left}h._",
             parse_mode='Markdown'
         )
     
@@ -336,6 +406,12 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.message.reply_text("🔄 Refreshing...")
         # Would fetch fresh data here
     
+    elif query.data.startswith("chart_portfolio_"):
+        range_ = query.data.replace("chart_portfolio_", "")
+        wallets = user_wallets.get(update.effective_user.id)
+        if wallets and range_ in RANGES:
+            await send_chart(query.message, wallet_series(wallets[0]), range_, "💼 Portfolio value", "${:,.0f}")
+    
     elif query.data.startswith("alert_"):
         setting = query.data.replace("alert_", "")
         await query.message.reply_text(f"✅ Alert setting updated: {setting}")
@@ -343,6 +419,117 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif query.data == "set_alerts":
         await alerts(update, context)
 
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Inline search over subnets and validators, served from the in-memory index"""
+    query = update.inline_query.query
+    
+    results = [
+        InlineQueryResultArticle(
+            id=entry.id,
+            title=entry.title,
+            description=entry.description,
+            input_message_content=InputTextMessageContent(entry.text, parse_mode='Markdown')
+        )
+        for entry in search_index.search(query)
+    ]
+    
+    await update.inline_query.answer(results, cache_time=INLINE_CACHE_TIME)
+
+# ============== CHARTS ==============
+
+async def send_chart(message, series: str, range_: str, title: str, value_fmt: str, quiet: bool = False):
+    """Envoie une sparkline en réutilisant le file_id Telegram si elle a déjà été uploadée"""
+    chart = await chart_cache.get(series, range_)
+    if chart is None:
+        if not quiet:
+            await message.reply_text("📉 Not enough history yet for this chart — check back in a few hours!")
+        return
+    
+    change = (chart.last - chart.first) / chart.first * 100 if chart.first else 0
+    caption = f"{title} · {range_}\n{value_fmt.format(chart.last)} ({change:+.1f}%)"
+    
+    if chart.file_id:
+        try:
+            await message.reply_photo(photo=chart.file_id, caption=caption)
+            return
+        except BadRequest:
+            # file_id en cache invalide : on l'oublie et on réuploade le PNG
+            logger.warning(f"Cached chart file_id rejected, re-uploading {chart.key}")
+            chart_cache.forget(chart.key)
+            chart = await chart_cache.get(series, range_)
+            if chart is None:
+                return
+    
+    # Premier upload sous le verrou du graphique : un appel concurrent attend
+    # puis réutilise le file_id au lieu d'uploader une seconde fois
+    async with chart_cache.lock(chart.key):
+        file_id = chart_cache.file_id(chart.key)
+        sent = await message.reply_photo(photo=file_id or chart.png, caption=caption)
+        if file_id is None and sent.photo:
+            chart_cache.remember_file_id(chart.key, sent.photo[-1].file_id)
+
+async def record_snapshot():
+    """Enregistre un point d'historique (subnets, wallets suivis) et met à jour l'index inline"""
+    price = await taostats.get_tao_price()
+    
+    entries = []
+    async for s in taostats.iter_subnets():
+        if s["netuid"] is None:
+            continue
+        history.append(subnet_series(s["netuid"], "emission"), s["emission"])
+        if s["price"]:
+            history.append(subnet_series(s["netuid"], "price"), s["price"])
+        entries.append(subnet_entry(s))
+    
+    validator_entries = [validator_entry(v) async for v in taostats.iter_validators() if v["name"] and v["hotkey"]]
+    if entries:
+        # Un appel validateurs en échec ne doit pas vider l'index
+        validator_entries = validator_entries or [
+            e for e in search_index.entries.values() if e.kind == "validator"
+        ]
+        changed = search_index.update(entries + validator_entries)
+        logger.info(f"Search index: {changed} entries updated, {len(search_index.entries)} total")
+    
+    if not price["usd"]:
+        return  # sans prix, la valeur USD des wallets serait fausse
+    for wallet in {w for wallets in user_wallets.values() for w in wallets}:
+        balance = await taostats.get_wallet_balance(wallet)
+        if balance:
+            history.append(wallet_series(wallet), balance["balance"] * price["usd"])
+
+async def snapshot_loop():
+    """Échantillonne l'historique toutes les SNAPSHOT_INTERVAL secondes"""
+    cycles = 0
+    while True:
+        try:
+            await record_snapshot()
+            # Rétention une fois par jour
+            if cycles % (86400 // SNAPSHOT_INTERVAL) == 0:
+                history.prune_all()
+                chart_cache.prune()
+        except Exception as e:
+            logger.error(f"Snapshot error: {e}")
+        cycles += 1
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+
+async def notify_activation(app: Application, intent: dict, sub: dict):
+    """Prévient l'utilisateur que son paiement TAO a activé son plan"""
+    expires = datetime.fromtimestamp(sub["expires"]).strftime('%Y-%m-%d')
+    await app.bot.send_message(
+        chat_id=intent["user_id"],
+        text=(
+            f"✅ *Payment received!*\n\n"
+            f"Your *{PLANS[sub['plan']]['name']}* plan is active until {expires}.\n"
+            f"Thanks for supporting Subnavis 🧭"
+        ),
+        parse_mode='Markdown'
+    )
+
+async def post_init(app: Application):
+    """Tâches de fond lancées avec le bot"""
+    app.create_task(snapshot_loop())
+    app.create_task(payment_watcher.run(lambda intent, sub: notify_activation(app, intent, sub)))
+
 # ============== MAIN ==============
 
 def main():
@@ -350,17 +537,19 @@ def main():
     print("🧭 Starting Subnavis Bot...")
     
     # Create application
-    app = Application.builder().token(BOT_TOKEN).build()
+    app = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
     
     # Add handlers
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("track", track))
     app.add_handler(CommandHandler("portfolio", portfolio))
     app.add_handler(CommandHandler("whale", whale))
+    app.add_handler(CommandHandler("chart", chart))
     app.add_handler(CommandHandler("alerts", alerts))
     app.add_handler(CommandHandler("pricing", pricing))
     app.add_handler(CommandHandler("help", help_command))
     app.add_handler(CallbackQueryHandler(button_callback))
+    app.add_handler(InlineQueryHandler(inline_query))
     
     # Run
     print("✅ Bot is running!")
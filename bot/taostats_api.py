@@ -7,13 +7,27 @@ Récupère les vraies données Bittensor
 import os
 import aiohttp
 import asyncio
-from typing import Optional, Dict, List
-from datetime import datetime
+from typing import AsyncIterator, Optional, Dict, List, Union
+from datetime import datetime, timezone
 
 # Config
 TAOSTATS_API_KEY = os.getenv("TAOSTATS_API_KEY", "")
 TAOSTATS_BASE_URL = "https://api.taostats.io/api"
 COINGECKO_URL = "https://api.coingecko.com/api/v3"
+PAGE_SIZE = 200  # lignes par page pour les endpoints liste
+WHALE_SCAN_LATEST = 50  # extrinsics examinés par défaut pour les whales (une seule requête)
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    """block_timestamp TaoStats (ISO 8601) -> datetime UTC"""
+    if not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
 
 class TaoStatsClient:
     """Client async pour l'API TaoStats"""
@@ -25,21 +39,87 @@ class TaoStatsClient:
             "Content-Type": "application/json"
         }
     
-    async def _get(self, endpoint: str, params: dict = None) -> Optional[dict]:
-        """Requête GET générique"""
+    async def _get(self, endpoint: str, params: dict = None,
+                   session: Optional[aiohttp.ClientSession] = None) -> Optional[dict]:
+        """Requête GET générique (réutilise `session` si fournie)"""
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{TAOSTATS_BASE_URL}{endpoint}"
-                async with session.get(url, headers=self.headers, params=params) as resp:
-                    if resp.status == 200:
-                        return await resp.json()
-                    else:
-                        print(f"TaoStats API error: {resp.status}")
-                        return None
+            if session is None:
+                async with aiohttp.ClientSession() as session:
+                    return await self._get(endpoint, params, session)
+            url = f"{TAOSTATS_BASE_URL}{endpoint}"
+            async with session.get(url, headers=self.headers, params=params) as resp:
+                if resp.status == 200:
+                    return await resp.json()
+                else:
+                    print(f"TaoStats API error: {resp.status}")
+                    return None
         except Exception as e:
             print(f"TaoStats API exception: {e}")
             return None
     
+    async def _iter_pages(self, endpoint: str, params: dict = None,
+                          max_items: Optional[int] = None) -> AsyncIterator[dict]:
+        """Itère toutes les lignes d'un endpoint paginé.
+        
+        La page suivante est préchargée pendant que l'appelant consomme la page
+        courante ; au plus deux pages sont en mémoire. Le préchargement ne démarre
+        qu'une fois la première ligne de la page consommée et la suivante demandée :
+        un appelant qui s'arrête sur la première ligne ne déclenche aucune autre
+        requête. S'il s'arrête plus tard (break, aclose), la page suivante a déjà été
+        demandée : le préchargement est annulé, mais la requête peut être partie.
+        Aucune page n'est demandée au-delà de `max_items`.
+        """
+        params = dict(params or {})
+        params["limit"] = min(PAGE_SIZE, max_items) if max_items else PAGE_SIZE
+        
+        async with aiohttp.ClientSession() as session:
+            def fetch(page: int) -> asyncio.Future:
+                return asyncio.ensure_future(self._get(endpoint, {**params, "page": page}, session))
+            
+            page, yielded = 1, 0
+            pending = fetch(page)
+            try:
+                while pending is not None:
+                    data = await pending
+                    pending = None
+                    rows = (data or {}).get("data") or []
+                    if not rows:
+                        return
+                    
+                    # Sans bloc pagination, une page pleine laisse supposer une suite
+                    pagination = data.get("pagination")
+                    if pagination is not None:
+                        next_page = pagination.get("next_page")
+                    else:
+                        next_page = page + 1 if len(rows) >= params["limit"] else None
+                    
+                    if max_items is not None:
+                        rows = rows[:max_items - yielded]
+                    if not (next_page and (max_items is None or yielded + len(rows) < max_items)):
+                        next_page = None
+                    
+                    for row in rows:
+                        yielded += 1
+                        yield row
+                        # L'appelant en redemande : on précharge la page suivante (une fois)
+                        if next_page and pending is None:
+                            page = next_page
+                            pending = fetch(page)
+                    
+                    if next_page and pending is None:
+                        page = next_page
+                        pending = fetch(page)
+            finally:
+                if pending is not None and not pending.done():
+                    pending.cancel()
+    
+    async def get_latest_block(self) -> Optional[int]:
+        """Numéro du dernier bloc"""
+        data = await self._get("/v1/block/latest", {"limit": 1})
+        if data and data.get("data"):
+            return int(data["data"][0].get("block_number") or 0) or None
+        return None
+    
     async def get_tao_price(self) -> dict:
         """Récupère le prix TAO via CoinGecko"""
         try:
@@ -72,33 +152,34 @@ class TaoStatsClient:
                 }
         return None
     
+    async def iter_stakes(self, address: str) -> AsyncIterator[dict]:
+        """Itère tous les stakes d'un wallet par subnet"""
+        async for s in self._iter_pages("/v1/stake/latest", {"address": address}):
+            yield {
+                "subnet_id": s.get("netuid"),
+                "hotkey": s.get("hotkey"),
+                "stake": float(s.get("stake", 0)) / 1e9,
+            }
+    
     async def get_wallet_stakes(self, address: str) -> List[dict]:
         """Récupère les stakes d'un wallet par subnet"""
-        data = await self._get(f"/v1/stake/latest", {"address": address})
-        stakes = []
-        if data and "data" in data:
-            for s in data.get("data", []):
-                stakes.append({
-                    "subnet_id": s.get("netuid"),
-                    "hotkey": s.get("hotkey"),
-                    "stake": float(s.get("stake", 0)) / 1e9,
-                })
-        return stakes
+        return [s async for s in self.iter_stakes(address)]
+    
+    async def iter_subnets(self, limit: Optional[int] = None) -> AsyncIterator[dict]:
+        """Itère les subnets (tous si `limit` est None)"""
+        async for s in self._iter_pages("/v1/subnet/latest", max_items=limit):
+            yield {
+                "netuid": s.get("netuid"),
+                "name": s.get("name", f"SN{s.get('netuid')}"),
+                "emission": float(s.get("emission", 0)),
+                "price": float(s.get("price", 0) or 0),
+                "tempo": s.get("tempo"),
+                "owner": s.get("owner"),
+            }
     
     async def get_subnets(self, limit: int = 20) -> List[dict]:
         """Récupère la liste des subnets"""
-        data = await self._get("/v1/subnet/latest", {"limit": limit})
-        subnets = []
-        if data and "data" in data:
-            for s in data.get("data", []):
-                subnets.append({
-                    "netuid": s.get("netuid"),
-                    "name": s.get("name", f"SN{s.get('netuid')}"),
-                    "emission": float(s.get("emission", 0)),
-                    "tempo": s.get("tempo"),
-                    "owner": s.get("owner"),
-                })
-        return subnets
+        return [s async for s in self.iter_subnets(limit)]
     
     async def get_subnet_detail(self, netuid: int) -> Optional[dict]:
         """Récupère les détails d'un subnet"""
@@ -118,28 +199,113 @@ class TaoStatsClient:
                 }
         return None
     
-    async def get_whale_movements(self, min_amount: float = 10000) -> List[dict]:
-        """Récupère les derniers gros mouvements (whale alerts)"""
-        # Note: TaoStats n'a pas d'endpoint whale direct, on utilise les transfers
-        data = await self._get("/v1/extrinsic/latest", {
-            "module": "subtensorModule",
-            "limit": 50
-        })
+    async def iter_validators(self) -> AsyncIterator[dict]:
+        """Itère tous les validateurs (nom, hotkey, stake)"""
+        async for v in self._iter_pages("/v1/validator/latest"):
+            yield {
+                "hotkey": v.get("hotkey"),
+                "name": v.get("name"),
+                "stake": float(v.get("stake", 0)) / 1e9,
+                "netuid": v.get("netuid"),
+            }
+    
+    async def get_validators(self) -> List[dict]:
+        """Récupère les validateurs (nom, hotkey, stake)"""
+        return [v async for v in self.iter_validators()]
+    
+    async def iter_extrinsics(self, since: Union[datetime, int, None] = None,
+                              module: str = "subtensorModule",
+                              max_items: Optional[int] = None) -> AsyncIterator[dict]:
+        """Itère les extrinsics du plus récent au plus ancien, jusqu'à `since` (datetime ou timestamp unix)
+        et au plus `max_items`"""
+        if isinstance(since, (int, float)):
+            since = datetime.fromtimestamp(since, tz=timezone.utc)
+        
+        params = {"module": module}
+        if since is not None:
+            params["timestamp_start"] = int(since.timestamp())
+        
+        async for tx in self._iter_pages("/v1/extrinsic/latest", params, max_items=max_items):
+            timestamp = _parse_timestamp(tx.get("block_timestamp"))
+            # Triés du plus récent au plus ancien : on s'arrête sans charger la page suivante
+            if since is not None and timestamp is not None and timestamp < since:
+                return
+            yield {
+                "type": tx.get("call", "transfer"),
+                "amount": float(tx.get("amount", 0)) / 1e9,
+                "from": tx.get("from") or "",
+                "to": tx.get("to") or "",
+                "timestamp": tx.get("block_timestamp"),
+                "subnet": tx.get("netuid"),
+                "block": tx.get("block_number"),
+                "hash": tx.get("extrinsic_hash") or tx.get("hash"),
+            }
+    
+    async def iter_transfers(self, to: str, since_block: int = 0) -> AsyncIterator[dict]:
+        """Itère les transferts reçus par `to` depuis le bloc `since_block` inclus, par bloc croissant"""
+        params = {"to": to, "order": "block_number_asc"}
+        if since_block:
+            params["block_start"] = since_block
+        
+        async for tx in self._iter_pages("/v1/transfer", params):
+            block = int(tx.get("block_number") or 0)
+            if since_block and block and block < since_block:
+                continue
+            yield {
+                "hash": tx.get("extrinsic_id") or tx.get("hash"),
+                "from": tx.get("from") or "",
+                "to": tx.get("to") or "",
+                "amount_rao": int(tx.get("amount", 0)),
+                "block": block,
+                "memo": tx.get("memo") or tx.get("remark"),
+                "timestamp": tx.get("block_timestamp"),
+            }
+    
+    async def iter_delegations(self, since: Union[datetime, int, None] = None,
+                               min_amount: float = 0,
+                               max_items: Optional[int] = None) -> AsyncIterator[dict]:
+        """Itère les stakes/unstakes d'au moins `min_amount` τ depuis `since`, filtrés côté serveur"""
+        if isinstance(since, (int, float)):
+            since = datetime.fromtimestamp(since, tz=timezone.utc)
+        
+        params = {"amount_min": int(min_amount * 1e9)}
+        if since is not None:
+            params["timestamp_start"] = int(since.timestamp())
         
+        async for d in self._iter_pages("/v1/delegation", params, max_items=max_items):
+            timestamp = _parse_timestamp(d.get("block_timestamp"))
+            if since is not None and timestamp is not None and timestamp < since:
+                return
+            yield {
+                "type": "remove_stake" if str(d.get("action", "")).upper() == "UNDELEGATE" else "add_stake",
+                "amount": float(d.get("amount", 0)) / 1e9,
+                "subnet": d.get("netuid"),
+                "timestamp": d.get("block_timestamp"),
+                "block": d.get("block_number"),
+            }
+    
+    async def get_whale_movements(self, min_amount: float = 10000,
+                                  since: Union[datetime, int, None] = None,
+                                  limit: Optional[int] = 10,
+                                  max_scan: Optional[int] = WHALE_SCAN_LATEST) -> List[dict]:
+        """Récupère les gros mouvements parmi les `max_scan` derniers extrinsics (depuis `since` si fourni)"""
+        # Note: TaoStats n'a pas d'endpoint whale direct, on utilise les extrinsics
         whales = []
-        if data and "data" in data:
-            for tx in data.get("data", []):
-                amount = float(tx.get("amount", 0)) / 1e9
-                if amount >= min_amount:
-                    whales.append({
-                        "type": tx.get("call", "transfer"),
-                        "amount": amount,
-                        "from": tx.get("from", "")[:8] + "...",
-                        "to": tx.get("to", "")[:8] + "..." if tx.get("to") else "",
-                        "timestamp": tx.get("block_timestamp"),
-                        "subnet": tx.get("netuid"),
-                    })
-        return whales[:10]  # Top 10
+        extrinsics = self.iter_extrinsics(since=since, max_items=max_scan)
+        try:
+            async for tx in extrinsics:
+                if tx["amount"] < min_amount:
+                    continue
+                whales.append({
+                    **tx,
+                    "from": tx["from"][:8] + "...",
+                    "to": tx["to"][:8] + "..." if tx["to"] else "",
+                })
+                if limit is not None and len(whales) >= limit:
+                    break
+        finally:
+            await extrinsics.aclose()  # annule le préchargement en cours
+        return whales
 
 
 # Instance globale
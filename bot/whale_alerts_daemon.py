@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Whale Alerts Daemon pour @SubNavisAlerts
-Surveille les gros mouvements et poste sur le channel Telegram
+Surveille les gros mouvements et poste sur le channel Telegram,
+et tient à jour le market board épinglé
 """
 
 import os
@@ -14,12 +15,14 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from taostats_api import taostats
+from market_board import MarketBoard
 
 # Config
 BOT_TOKEN = os.getenv("SUBNAVIS_BOT_TOKEN")
 CHANNEL_ID = "@SubNavisAlerts"  # Channel public
 CHECK_INTERVAL = 300  # 5 minutes
 MIN_WHALE_AMOUNT = 10000  # 10k TAO minimum pour alerter
+MAX_SCAN = 1000  # extrinsics examinés au plus par cycle (5 pages)
 
 # Logging
 logging.basicConfig(
@@ -31,6 +34,10 @@ logger = logging.getLogger(__name__)
 # Cache pour éviter les doublons
 seen_transactions = set()
 
+# Début du dernier scan : le suivant reprend à partir de là (chevauchement couvert par le cache)
+last_check = None
+SCAN_OVERLAP = 60
+
 
 async def format_whale_alert(whale: dict, price: dict) -> str:
     """Formate une alerte whale pour le channel"""
@@ -78,11 +85,18 @@ async def format_whale_alert(whale: dict, price: dict) -> str:
 
 async def check_and_post_alerts(bot: Bot):
     """Vérifie les nouveaux mouvements whale et poste sur le channel"""
-    global seen_transactions
+    global seen_transactions, last_check
     
     try:
-        # Récupérer les données
-        whales = await taostats.get_whale_movements(min_amount=MIN_WHALE_AMOUNT)
+        # Récupérer les mouvements depuis le dernier scan (les 50 derniers extrinsics au démarrage)
+        started = int(datetime.now().timestamp())
+        if last_check is None:
+            whales = await taostats.get_whale_movements(min_amount=MIN_WHALE_AMOUNT)
+        else:
+            whales = await taostats.get_whale_movements(
+                min_amount=MIN_WHALE_AMOUNT, since=last_check - SCAN_OVERLAP, limit=None, max_scan=MAX_SCAN
+            )
+        last_check = started
         price = await taostats.get_tao_price()
         
         if not whales:
@@ -91,7 +105,7 @@ async def check_and_post_alerts(bot: Bot):
         
         for whale in whales:
             # Créer un identifiant unique pour cette transaction
-            tx_id = f"{whale['type']}_{whale['amount']}_{whale.get('from', '')}_{whale.get('timestamp', '')}"
+            tx_id = whale.get("hash") or f"{whale['type']}_{whale['amount']}_{whale.get('from', '')}_{whale.get('timestamp', '')}"
             
             if tx_id in seen_transactions:
                 continue
@@ -140,15 +154,9 @@ async def main():
     logger.info(f"⏱️ Check interval: {CHECK_INTERVAL}s")
     logger.info(f"💰 Min amount: {MIN_WHALE_AMOUNT} TAO")
     
-    # Message de démarrage sur le channel
-    try:
-        await bot.send_message(
-            chat_id=CHANNEL_ID,
-            text="🐋 *Whale Alerts Online*\n\nMonitoring Bittensor for large movements...\n\n_Powered by SubNavis.io_",
-            parse_mode='Markdown'
-        )
-    except Exception as e:
-        logger.warning(f"Could not send startup message: {e}")
+    # Le board épinglé (édité sur place) remplace le message de démarrage
+    board = MarketBoard(CHANNEL_ID)
+    board_task = asyncio.create_task(board.run(bot))
     
     while True:
         await check_and_post_alerts(bot)